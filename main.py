@@ -4,15 +4,424 @@ import subprocess
 import threading
 import venv
 import sqlite3
+import shutil
+import shlex
+import time
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QScrollArea, QFrame, QListWidget, QTextEdit, QPushButton, QDialog,
-    QStackedWidget, QSizePolicy, QMessageBox, QInputDialog, QMenu, QFileDialog
+    QStackedWidget, QSizePolicy, QMessageBox, QInputDialog, QMenu, QFileDialog,
+    QFormLayout, QSpinBox, QComboBox, QLineEdit, QCheckBox, QDialogButtonBox,
+    QProgressBar, QTableWidget, QTableWidgetItem, QHeaderView
 )
 
 from PySide6.QtGui import QFont, QAction, QPixmap
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QObject, QTimer
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+DB_BUSY_TIMEOUT = 5.0
+DB_WRITE_ATTEMPTS = 5
+# Запись из слотов интерфейса ждёт блокировку недолго, чтобы не замораживать цикл событий
+GUI_BUSY_TIMEOUT = 0.5
+GUI_WRITE_ATTEMPTS = 3
+CHANGE_LOG_RETENTION = "-1 day"
+
+
+SCHEMA_MIGRATIONS = [
+    (1, """
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER,
+            title TEXT,
+            description TEXT,
+            FOREIGN KEY(group_id) REFERENCES groups(id)
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            title TEXT PRIMARY KEY,
+            content TEXT
+        );
+    """),
+    # Карточки удаляются каскадно вместе с группой, код хранится по id карточки.
+    # Карточки без группы и документы без карточки переносятся в группу восстановления, а не теряются
+    (2, """
+        INSERT OR IGNORE INTO groups (name)
+            SELECT 'Восстановленные карточки'
+            WHERE EXISTS (SELECT 1 FROM cards WHERE group_id IS NULL OR group_id NOT IN (SELECT id FROM groups))
+               OR EXISTS (SELECT 1 FROM documents WHERE NOT EXISTS (
+                   SELECT 1 FROM cards WHERE cards.title = documents.title));
+
+        CREATE TABLE cards_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL,
+            title TEXT,
+            description TEXT,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE CASCADE
+        );
+        INSERT INTO cards_new (id, group_id, title, description)
+            SELECT id,
+                   CASE WHEN group_id IN (SELECT id FROM groups) THEN group_id
+                        ELSE (SELECT id FROM groups WHERE name = 'Восстановленные карточки') END,
+                   title, description
+            FROM cards;
+        INSERT INTO cards_new (group_id, title, description)
+            SELECT (SELECT id FROM groups WHERE name = 'Восстановленные карточки'), title, ''
+            FROM documents
+            WHERE NOT EXISTS (SELECT 1 FROM cards WHERE cards.title = documents.title);
+        DROP TABLE cards;
+        ALTER TABLE cards_new RENAME TO cards;
+        CREATE INDEX idx_cards_group_id ON cards(group_id);
+
+        ALTER TABLE documents RENAME TO documents_v1;
+        CREATE TABLE documents (
+            card_id INTEGER PRIMARY KEY,
+            content TEXT,
+            FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+        );
+        INSERT INTO documents (card_id, content)
+            SELECT cards.id, documents_v1.content FROM cards
+            JOIN documents_v1 ON documents_v1.title = cards.title;
+        DROP TABLE documents_v1;
+    """),
+    # Профили запуска: 0 и пустые значения означают "без ограничения"
+    (3, """
+        CREATE TABLE run_profiles (
+            card_id INTEGER PRIMARY KEY,
+            memory_mb INTEGER NOT NULL DEFAULT 0,
+            cpu_seconds INTEGER NOT NULL DEFAULT 0,
+            open_files INTEGER NOT NULL DEFAULT 0,
+            nice INTEGER NOT NULL DEFAULT 0,
+            ionice_class INTEGER NOT NULL DEFAULT 0,
+            ionice_level INTEGER NOT NULL DEFAULT 4,
+            cpu_affinity TEXT NOT NULL DEFAULT '',
+            use_cgroup INTEGER NOT NULL DEFAULT 0,
+            cpu_quota INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+        );
+    """),
+    # Журнал изменений заполняется триггерами, поэтому его видят и записи из сторонних скриптов
+    (4, """
+        CREATE TABLE changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            group_id INTEGER,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX idx_changes_changed_at ON changes(changed_at);
+
+        CREATE TRIGGER groups_insert_change AFTER INSERT ON groups BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('groups', NEW.id, NEW.id, 'insert');
+        END;
+        CREATE TRIGGER groups_update_change AFTER UPDATE ON groups BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('groups', NEW.id, NEW.id, 'update');
+        END;
+        CREATE TRIGGER groups_delete_change AFTER DELETE ON groups BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('groups', OLD.id, OLD.id, 'delete');
+        END;
+
+        CREATE TRIGGER cards_insert_change AFTER INSERT ON cards BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('cards', NEW.id, NEW.group_id, 'insert');
+        END;
+        CREATE TRIGGER cards_update_change AFTER UPDATE ON cards BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('cards', NEW.id, NEW.group_id, 'update');
+            INSERT INTO changes (entity, entity_id, group_id, op)
+                SELECT 'cards', OLD.id, OLD.group_id, 'update' WHERE OLD.group_id IS NOT NEW.group_id;
+        END;
+        CREATE TRIGGER cards_delete_change AFTER DELETE ON cards BEGIN
+            INSERT INTO changes (entity, entity_id, group_id, op) VALUES ('cards', OLD.id, OLD.group_id, 'delete');
+        END;
+
+        CREATE TRIGGER documents_insert_change AFTER INSERT ON documents BEGIN
+            INSERT INTO changes (entity, entity_id, op) VALUES ('documents', NEW.card_id, 'insert');
+        END;
+        CREATE TRIGGER documents_update_change AFTER UPDATE ON documents BEGIN
+            INSERT INTO changes (entity, entity_id, op) VALUES ('documents', NEW.card_id, 'update');
+        END;
+        CREATE TRIGGER documents_delete_change AFTER DELETE ON documents BEGIN
+            INSERT INTO changes (entity, entity_id, op) VALUES ('documents', OLD.card_id, 'delete');
+        END;
+    """),
+]
+
+DEFAULT_RUN_PROFILE = {
+    "memory_mb": 0,
+    "cpu_seconds": 0,
+    "open_files": 0,
+    "nice": 0,
+    "ionice_class": 0,
+    "ionice_level": 4,
+    "cpu_affinity": "",
+    "use_cgroup": 0,
+    "cpu_quota": 0,
+}
+
+
+def connect_db(db_path, timeout=DB_BUSY_TIMEOUT):
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def is_busy_error(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def write_db(db_path, sql, params=(), timeout=DB_BUSY_TIMEOUT, attempts=DB_WRITE_ATTEMPTS):
+    # busy_timeout покрывает большинство конфликтов, но при долгих чужих транзакциях запись повторяется
+    for attempt in range(attempts):
+        conn = connect_db(db_path, timeout)
+        try:
+            with conn:
+                return conn.execute(sql, params).lastrowid
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.1 * 2 ** attempt)
+        finally:
+            conn.close()
+
+
+def gui_write_db(parent, db_path, sql, params=()):
+    try:
+        write_db(db_path, sql, params, GUI_BUSY_TIMEOUT, GUI_WRITE_ATTEMPTS)
+    except sqlite3.OperationalError as e:
+        QMessageBox.warning(parent, "Ошибка", f"Не удалось записать в базу данных: {e}")
+        return False
+    return True
+
+
+def split_sql(script):
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+    if statement.strip():
+        yield statement.strip()
+
+
+def schema_version(conn):
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'").fetchone():
+        return 0
+    return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+
+def migrate_db(db_path):
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        current = schema_version(conn)
+        if current == SCHEMA_MIGRATIONS[-1][0]:
+            return
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='cards'").fetchone():
+            # Перед перестройкой таблиц сохраняем копию существующей базы
+            backup = sqlite3.connect(f"{db_path}.v{current}.bak")
+            try:
+                conn.backup(backup)
+            finally:
+                backup.close()
+        # foreign_keys нельзя переключить внутри транзакции, а пересборка таблиц требует его выключить
+        conn.execute("PRAGMA foreign_keys = OFF")
+        for attempt in range(DB_WRITE_ATTEMPTS):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                # Другой экземпляр может дольше busy_timeout перестраивать большую базу
+                if not is_busy_error(e) or attempt == DB_WRITE_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+            # Версию перечитываем под блокировкой: другой экземпляр мог уже выполнить миграцию
+            current = schema_version(conn)
+            for version, script in SCHEMA_MIGRATIONS:
+                if version <= current:
+                    continue
+                for statement in split_sql(script):
+                    conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            if conn.execute("PRAGMA foreign_key_check").fetchone():
+                raise sqlite3.IntegrityError("миграция нарушает внешние ключи")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def load_run_profile(db_path, card_id):
+    fields = list(DEFAULT_RUN_PROFILE)
+    conn = connect_db(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(fields)} FROM run_profiles WHERE card_id=?", (card_id,))
+    row = cursor.fetchone()
+    conn.close()
+    if not row:
+        return dict(DEFAULT_RUN_PROFILE)
+    return dict(zip(fields, row))
+
+
+def save_run_profile(db_path, card_id, profile, timeout=DB_BUSY_TIMEOUT, attempts=DB_WRITE_ATTEMPTS):
+    fields = list(DEFAULT_RUN_PROFILE)
+    write_db(db_path, f"""
+        INSERT INTO run_profiles (card_id, {', '.join(fields)})
+        VALUES (?, {', '.join('?' for _ in fields)})
+        ON CONFLICT(card_id) DO UPDATE SET {', '.join(f'{f}=excluded.{f}' for f in fields)}
+    """, (card_id, *(profile[f] for f in fields)), timeout, attempts)
+
+
+def parse_cpu_list(text):
+    cpus = set()
+    for part in (text or "").replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def delegated_cgroup_root():
+    if not os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+        return None
+    try:
+        with open("/proc/self/cgroup") as f:
+            own = next(line.split("::", 1)[1].strip() for line in f if line.startswith("0::"))
+    except (OSError, StopIteration):
+        return None
+    # В собственной группе процесса дочерние с контроллерами создать нельзя (no internal processes),
+    # поэтому группы запусков создаются рядом с ней, если родитель делегирован текущему пользователю
+    base = os.path.join(CGROUP_ROOT, os.path.dirname(own).lstrip("/"))
+    for name in ("", "cgroup.procs", "cgroup.subtree_control"):
+        if not os.access(os.path.join(base, name), os.W_OK):
+            return None
+    return base
+
+
+def prepare_cgroup(prefix, profile):
+    if not profile["use_cgroup"]:
+        return None
+    base = delegated_cgroup_root()
+    if base is None:
+        raise OSError("нет доступной для записи cgroup v2")
+    needed = set()
+    if profile["memory_mb"]:
+        needed.add("memory")
+    if profile["cpu_quota"]:
+        needed.add("cpu")
+    with open(os.path.join(base, "cgroup.subtree_control")) as f:
+        needed -= set(f.read().split())
+    if needed:
+        with open(os.path.join(base, "cgroup.subtree_control"), "w") as f:
+            f.write(" ".join(f"+{name}" for name in sorted(needed)))
+
+    path = os.path.join(base, f"ancile-{prefix}-{uuid.uuid4().hex[:8]}")
+    os.mkdir(path)
+    try:
+        if profile["memory_mb"]:
+            with open(os.path.join(path, "memory.max"), "w") as f:
+                f.write(str(profile["memory_mb"] * 1024 * 1024))
+        if profile["cpu_quota"]:
+            # cpu_quota задаётся в процентах одного ядра
+            with open(os.path.join(path, "cpu.max"), "w") as f:
+                f.write(f"{profile['cpu_quota'] * 1000} 100000")
+    except OSError:
+        remove_cgroup(path)
+        raise
+    return path
+
+
+def remove_cgroup(path):
+    if path:
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+# Ограничения применяет сам дочерний интерпретатор до запуска скрипта: preexec_fn небезопасен в многопоточном приложении
+LIMITS_BOOTSTRAP = """
+import json, os, runpy, sys
+limits = json.loads(sys.argv[1])
+if limits["cgroup"]:
+    # Процесс переходит в cgroup до запуска скрипта, чтобы ограничения действовали с самого начала
+    try:
+        with open(os.path.join(limits["cgroup"], "cgroup.procs"), "w") as f:
+            f.write(str(os.getpid()))
+    except OSError as e:
+        sys.stderr.write(f"⚠ Не удалось поместить процесс в cgroup: {e}\\n")
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    for name, value in limits["rlimits"].items():
+        kind = getattr(resource, name)
+        hard = resource.getrlimit(kind)[1]
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(kind, (value, value))
+if limits["nice"] and hasattr(os, "nice"):
+    os.nice(limits["nice"])
+if limits["cpus"] and hasattr(os, "sched_setaffinity"):
+    os.sched_setaffinity(0, limits["cpus"])
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def run_limits(profile, cgroup_path=None):
+    rlimits = {}
+    # RLIMIT_AS ограничивает адресное пространство, а не занятую память, поэтому в cgroup хватает memory.max
+    if profile["memory_mb"] and not cgroup_path:
+        rlimits["RLIMIT_AS"] = profile["memory_mb"] * 1024 * 1024
+    if profile["cpu_seconds"]:
+        rlimits["RLIMIT_CPU"] = profile["cpu_seconds"]
+    if profile["open_files"]:
+        rlimits["RLIMIT_NOFILE"] = profile["open_files"]
+    limits = {
+        "rlimits": rlimits,
+        "nice": profile["nice"],
+        "cpus": sorted(parse_cpu_list(profile["cpu_affinity"])),
+        "cgroup": cgroup_path,
+    }
+    if not rlimits and not limits["nice"] and not limits["cpus"] and not cgroup_path:
+        return None
+    return limits
+
+
+def script_command(python_exe, script_path, profile, args=(), cgroup_path=None):
+    limits = run_limits(profile, cgroup_path)
+    if limits:
+        command = [python_exe, "-c", LIMITS_BOOTSTRAP, json.dumps(limits), script_path, *args]
+    else:
+        command = [python_exe, script_path, *args]
+    return limited_command(command, profile)
+
+
+def limited_command(args, profile):
+    if profile["ionice_class"] and shutil.which("ionice"):
+        prefix = ["ionice", "-c", str(profile["ionice_class"])]
+        if profile["ionice_class"] != 3:
+            prefix += ["-n", str(profile["ionice_level"])]
+        return prefix + list(args)
+    return list(args)
 
 
 class Card(QFrame):
@@ -68,11 +477,52 @@ class CardGroup(QFrame):
         layout.addLayout(cards_layout)
         self.setSizePolicy(QSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed))
 
+class ChangeFeed(QObject):
+    changed = Signal(list)
+
+    def __init__(self, db_path="data.db", interval=500):
+        super().__init__()
+        self.db_path = db_path
+        migrate_db(self.db_path)
+        try:
+            write_db(self.db_path, "DELETE FROM changes WHERE changed_at < datetime('now', ?)",
+                     (CHANGE_LOG_RETENTION,))
+        except sqlite3.OperationalError:
+            # Очистка журнала необязательна, её выполнит следующий запуск
+            pass
+
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(seq) FROM changes")
+        self.last_seq = cursor.fetchone()[0] or 0
+        conn.close()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(interval)
+
+    def poll(self):
+        try:
+            conn = connect_db(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT seq, entity, entity_id, group_id, op FROM changes WHERE seq > ? ORDER BY seq",
+                           (self.last_seq,))
+            changes = cursor.fetchall()
+            conn.close()
+        except sqlite3.OperationalError:
+            return
+        if changes:
+            self.last_seq = changes[-1][0]
+            self.changed.emit(changes)
+
+
 class CardPage(QWidget):
-    def __init__(self, on_card_clicked, db_path="data.db"):
+    def __init__(self, on_card_clicked, db_path="data.db", feed=None):
         super().__init__()
         self.db_path = db_path
         self.on_card_clicked = on_card_clicked
+        self.feed = feed
+        self.group_widgets = {}
 
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
@@ -149,34 +599,17 @@ class CardPage(QWidget):
         """)
 
     def init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS groups (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                group_id INTEGER,
-                title TEXT,
-                description TEXT,
-                FOREIGN KEY(group_id) REFERENCES groups(id)
-            )
-        """)
-        conn.commit()
-        conn.close()
+        migrate_db(self.db_path)
 
     def load_groups(self):
+        self.group_widgets = {}
         while self.content_layout.count():
             item = self.content_layout.takeAt(0)
             w = item.widget()
             if w:
                 w.deleteLater()
 
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT id, name FROM groups ORDER BY id")
         groups = cursor.fetchall()
@@ -185,6 +618,7 @@ class CardPage(QWidget):
         for group_id, name in groups:
             group_widget = self.create_group_widget(group_id, name)
             self.content_layout.addWidget(group_widget)
+            self.group_widgets[group_id] = group_widget
 
         add_group_btn = QPushButton("+ Добавить группу")
         add_group_btn.setCursor(Qt.PointingHandCursor)
@@ -192,6 +626,36 @@ class CardPage(QWidget):
         self.content_layout.addWidget(add_group_btn)
         self.content_layout.addStretch()
 
+    def refresh(self):
+        if self.feed:
+            self.feed.poll()
+        else:
+            self.load_groups()
+
+    def apply_changes(self, changes):
+        group_ids = {group_id for _, entity, _, group_id, _ in changes
+                     if entity in ("groups", "cards") and group_id is not None}
+        for group_id in sorted(group_ids):
+            self.refresh_group(group_id)
+
+    def refresh_group(self, group_id):
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM groups WHERE id=?", (group_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        old = self.group_widgets.pop(group_id, None)
+        if old:
+            self.content_layout.removeWidget(old)
+            old.deleteLater()
+        if row:
+            # Виджеты групп идут в начале раскладки в порядке id
+            index = sum(1 for other_id in self.group_widgets if other_id < group_id)
+            group_widget = self.create_group_widget(group_id, row[0])
+            self.content_layout.insertWidget(index, group_widget)
+            self.group_widgets[group_id] = group_widget
+
     def create_group_widget(self, group_id, name):
         frame = QFrame()
         layout = QVBoxLayout(frame)
@@ -237,7 +701,7 @@ class CardPage(QWidget):
         cards_layout.setSpacing(8)
         cards_layout.setContentsMargins(4, 0, 4, 0)
 
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT id, title, description FROM cards WHERE group_id=? ORDER BY id", (group_id,))
         cards = cursor.fetchall()
@@ -248,7 +712,7 @@ class CardPage(QWidget):
             btn.setFixedSize(180, 110)
             btn.setText(title)
             btn.setToolTip(desc or "")
-            btn.clicked.connect(partial(self.on_card_clicked, title, desc or ""))
+            btn.clicked.connect(partial(self.on_card_clicked, card_id, title, desc or ""))
 
             btn.setContextMenuPolicy(Qt.CustomContextMenu)
             btn.customContextMenuRequested.connect(partial(self.card_context_menu, card_id, btn))
@@ -272,14 +736,10 @@ class CardPage(QWidget):
             if not name:
                 return
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO groups (name) VALUES (?)", (name,))
-                conn.commit()
-                conn.close()
+                gui_write_db(self, self.db_path, "INSERT INTO groups (name) VALUES (?)", (name,))
             except sqlite3.IntegrityError:
                 QMessageBox.warning(self, "Ошибка", "Группа с таким именем уже существует.")
-            self.load_groups()
+            self.refresh()
 
     def rename_group(self, group_id, old_name):
         name, ok = QInputDialog.getText(self, "Переименовать группу", "Новое имя:", text=old_name)
@@ -288,26 +748,17 @@ class CardPage(QWidget):
             if not name:
                 return
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE groups SET name=? WHERE id=?", (name, group_id))
-                conn.commit()
-                conn.close()
+                gui_write_db(self, self.db_path, "UPDATE groups SET name=? WHERE id=?", (name, group_id))
             except sqlite3.IntegrityError:
                 QMessageBox.warning(self, "Ошибка", "Группа с таким именем уже существует.")
-            self.load_groups()
+            self.refresh()
 
     def delete_group(self, group_id):
         reply = QMessageBox.question(self, "Удалить", "Удалить эту группу и все её карточки?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM cards WHERE group_id=?", (group_id,))
-            cursor.execute("DELETE FROM groups WHERE id=?", (group_id,))
-            conn.commit()
-            conn.close()
-            self.load_groups()
+            gui_write_db(self, self.db_path, "DELETE FROM groups WHERE id=?", (group_id,))
+            self.refresh()
 
     def add_card(self, group_id):
         title, ok = QInputDialog.getText(self, "Новая карточка", "Название скрипта:")
@@ -320,16 +771,12 @@ class CardPage(QWidget):
         if not ok2:
             desc = ""
         desc = (desc or "").strip()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO cards (group_id, title, description) VALUES (?, ?, ?)",
-                       (group_id, title, desc))
-        conn.commit()
-        conn.close()
-        self.load_groups()
+        gui_write_db(self, self.db_path, "INSERT INTO cards (group_id, title, description) VALUES (?, ?, ?)",
+                     (group_id, title, desc))
+        self.refresh()
 
     def rename_card(self, card_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT title FROM cards WHERE id=?", (card_id,))
         row = cursor.fetchone()
@@ -340,23 +787,15 @@ class CardPage(QWidget):
             name = (name or "").strip()
             if not name:
                 return
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE cards SET title=? WHERE id=?", (name, card_id))
-            conn.commit()
-            conn.close()
-            self.load_groups()
+            gui_write_db(self, self.db_path, "UPDATE cards SET title=? WHERE id=?", (name, card_id))
+            self.refresh()
 
     def delete_card(self, card_id):
         reply = QMessageBox.question(self, "Удалить", "Удалить эту карточку?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM cards WHERE id=?", (card_id,))
-            conn.commit()
-            conn.close()
-            self.load_groups()
+            gui_write_db(self, self.db_path, "DELETE FROM cards WHERE id=?", (card_id,))
+            self.refresh()
 
 class EditorPage(QWidget):
     back_clicked = Signal()
@@ -364,7 +803,9 @@ class EditorPage(QWidget):
     def __init__(self, db_path="data.db"):
         super().__init__()
         self.db_path = db_path
+        self.current_card_id = None
         self.current_title = None
+        self.saved_text = None
         self.process = None
 
         self.init_db()
@@ -380,8 +821,11 @@ class EditorPage(QWidget):
         self.run_button = QPushButton("▶ Run")
         self.stop_button = QPushButton("■ Stop")
         self.save_button = QPushButton("💾 Save")
+        self.profile_button = QPushButton("⚙ Limits")
+        self.batch_button = QPushButton("⇶ Batch")
 
-        for btn in [self.back_button, self.run_button, self.stop_button, self.save_button]:
+        for btn in [self.back_button, self.run_button, self.stop_button, self.save_button,
+                    self.profile_button, self.batch_button]:
             btn.setFixedHeight(32)
             btn.setStyleSheet("color: green;")
             btn.setCursor(Qt.PointingHandCursor)
@@ -422,52 +866,107 @@ class EditorPage(QWidget):
         self.save_button.clicked.connect(self.save_to_db)
         self.run_button.clicked.connect(self.run_code)
         self.stop_button.clicked.connect(self.stop_code)
+        self.profile_button.clicked.connect(self.edit_run_profile)
+        self.batch_button.clicked.connect(self.run_batch)
 
     def init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS documents (
-                title TEXT PRIMARY KEY,
-                content TEXT
-            )
-        """)
-        conn.commit()
-        conn.close()
+        migrate_db(self.db_path)
+
+    def edit_run_profile(self):
+        if self.current_card_id is None:
+            QMessageBox.warning(self, "Ошибка", "Неизвестен заголовок документа!")
+            return
+        dlg = RunProfileDialog(load_run_profile(self.db_path, self.current_card_id), self)
+        if dlg.exec() == QDialog.Accepted:
+            try:
+                save_run_profile(self.db_path, self.current_card_id, dlg.profile(),
+                                 GUI_BUSY_TIMEOUT, GUI_WRITE_ATTEMPTS)
+            except sqlite3.OperationalError as e:
+                QMessageBox.warning(self, "Ошибка", f"Не удалось записать в базу данных: {e}")
 
     def save_to_db(self):
-        if not self.current_title:
+        if self.current_card_id is None:
             QMessageBox.warning(self, "Ошибка", "Неизвестен заголовок документа!")
             return
 
         text = self.editor.toPlainText().strip()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO documents (title, content)
+        if not gui_write_db(self, self.db_path, """
+            INSERT INTO documents (card_id, content)
             VALUES (?, ?)
-            ON CONFLICT(title) DO UPDATE SET content=excluded.content
-        """, (self.current_title, text))
-        conn.commit()
-        conn.close()
+            ON CONFLICT(card_id) DO UPDATE SET content=excluded.content
+        """, (self.current_card_id, text)):
+            return
+        self.saved_text = text
+        self.editor.document().setModified(False)
 
         QMessageBox.information(self, "Сохранено", f"Документ '{self.current_title}' успешно сохранён!")
 
-    def set_content(self, title, desc):
+    def set_content(self, card_id, title, desc):
+        self.current_card_id = card_id
         self.current_title = title
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
-        cursor.execute("SELECT content FROM documents WHERE title=?", (title,))
+        cursor.execute("SELECT content FROM documents WHERE card_id=?", (card_id,))
         row = cursor.fetchone()
         conn.close()
 
+        self.saved_text = row[0] if row else None
         if row:
             self.editor.setPlainText(row[0])
         else:
             self.editor.setPlainText(f"# {title}\n\n{desc}")
+        self.editor.document().setModified(False)
 
         self.output.clear()
 
+    def apply_changes(self, changes):
+        if self.current_card_id is None:
+            return
+        for _, entity, entity_id, _, op in changes:
+            if entity_id != self.current_card_id:
+                continue
+            if entity == "cards" and op == "delete":
+                # Без карточки запуск выполнялся бы без её профиля ограничений, поэтому сбрасываем и заголовок
+                self.current_card_id = None
+                self.current_title = None
+                self.saved_text = None
+                self.append_output("\n⚠ Карточка удалена, запуск и сохранение недоступны.\n")
+                return
+            if entity == "cards":
+                self.reload_title()
+            if entity == "documents":
+                self.reload_document()
+
+    def reload_title(self):
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT title FROM cards WHERE id=?", (self.current_card_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row and row[0] != self.current_title:
+            self.current_title = row[0]
+            self.append_output(f"\nℹ Карточка переименована в '{row[0]}'.\n")
+
+    def reload_document(self):
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT content FROM documents WHERE card_id=?", (self.current_card_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        # Собственные сохранения тоже приходят через журнал, их узнаём по последнему сохранённому тексту
+        if not row or row[0] == self.saved_text:
+            return
+        self.saved_text = row[0]
+        if row[0] == self.editor.toPlainText().strip():
+            return
+        if self.editor.document().isModified():
+            self.append_output("\n⚠ Документ изменён в другом окне, сохранение перезапишет эти изменения.\n")
+        else:
+            self.editor.setPlainText(row[0])
+            self.editor.document().setModified(False)
+
     def ensure_venv(self):
         venv_dir = os.path.join("venvs", self.current_title)
         python_exe = os.path.join(venv_dir, "Scripts", "python.exe") if sys.platform.startswith("win") else os.path.join(venv_dir, "bin", "python")
@@ -480,28 +979,42 @@ class EditorPage(QWidget):
 
         return python_exe
 
-    def run_code(self):
-        if not self.current_title:
-            QMessageBox.warning(self, "Ошибка", "Неизвестен заголовок документа!")
-            return
-
+    def prepare_script(self):
         script_path = f"{self.current_title}.py"
         with open(script_path, "w", encoding="utf-8") as f:
             f.write(self.editor.toPlainText())
+        return script_path, self.ensure_venv()
+
+    def run_code(self):
+        if self.current_card_id is None or not self.current_title:
+            QMessageBox.warning(self, "Ошибка", "Неизвестен заголовок документа!")
+            return
 
-        python_exe = self.ensure_venv()
+        script_path, python_exe = self.prepare_script()
+        profile = load_run_profile(self.db_path, self.current_card_id)
 
         self.output.clear()
         self.output.append(f"▶ Запуск {script_path}...\n")
 
+        cgroup_path = None
+        try:
+            cgroup_path = prepare_cgroup(f"card-{self.current_card_id}", profile)
+        except OSError as e:
+            self.output.append(f"⚠ cgroup недоступен, запуск без него: {e}\n")
+
         def run_thread():
-            self.process = subprocess.Popen(
-                [python_exe, script_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
-            )
+            try:
+                self.process = subprocess.Popen(
+                    script_command(python_exe, script_path, profile, cgroup_path=cgroup_path),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1
+                )
+            except OSError as e:
+                self.append_output(f"\n⚠ Не удалось запустить процесс: {e}\n", is_error=True)
+                remove_cgroup(cgroup_path)
+                return
             for line in self.process.stdout:
                 self.append_output(line)
             for line in self.process.stderr:
@@ -509,9 +1022,31 @@ class EditorPage(QWidget):
             self.process.wait()
             self.append_output(f"\n=== Процесс завершён (код {self.process.returncode}) ===\n")
             self.process = None
+            remove_cgroup(cgroup_path)
 
         threading.Thread(target=run_thread, daemon=True).start()
 
+    def run_batch(self):
+        if self.current_card_id is None or not self.current_title:
+            QMessageBox.warning(self, "Ошибка", "Неизвестен заголовок документа!")
+            return
+
+        dlg = BatchRunDialog(self)
+        if dlg.exec() != QDialog.Accepted:
+            return
+        items = dlg.items()
+        if not items:
+            QMessageBox.warning(self, "Ошибка", "Список параметров пуст.")
+            return
+
+        script_path, python_exe = self.prepare_script()
+        profile = load_run_profile(self.db_path, self.current_card_id)
+        runner = BatchRunner(python_exe, script_path, items, dlg.workers.value(), dlg.retries.value(),
+                             dlg.use_stdin(), profile, f"card-{self.current_card_id}")
+        window = BatchResultsWindow(self.current_title, runner, self)
+        window.show()
+        runner.start()
+
     def stop_code(self):
         if self.process and self.process.poll() is None:
             self.process.terminate()
@@ -532,6 +1067,325 @@ class EditorPage(QWidget):
         self.output.append(text)
 
 
+class RunProfileDialog(QDialog):
+    def __init__(self, profile, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Ограничения запуска")
+        self.setModal(True)
+
+        layout = QFormLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        self.memory_mb = QSpinBox()
+        self.memory_mb.setRange(0, 1024 * 1024)
+        self.memory_mb.setSuffix(" МБ")
+        self.memory_mb.setSpecialValueText("без ограничения")
+        self.memory_mb.setValue(profile["memory_mb"])
+        self.memory_mb.setToolTip("Без cgroup ограничивает адресное пространство (RLIMIT_AS), "
+                                  "которое может быть намного больше занятой памяти.\n"
+                                  "При запуске в cgroup задаёт memory.max.")
+        layout.addRow("Адресное пространство / memory.max:", self.memory_mb)
+
+        self.cpu_seconds = QSpinBox()
+        self.cpu_seconds.setRange(0, 7 * 24 * 3600)
+        self.cpu_seconds.setSuffix(" с")
+        self.cpu_seconds.setSpecialValueText("без ограничения")
+        self.cpu_seconds.setValue(profile["cpu_seconds"])
+        layout.addRow("Время CPU:", self.cpu_seconds)
+
+        self.open_files = QSpinBox()
+        self.open_files.setRange(0, 1024 * 1024)
+        self.open_files.setSpecialValueText("без ограничения")
+        self.open_files.setValue(profile["open_files"])
+        layout.addRow("Открытых файлов:", self.open_files)
+
+        self.nice = QSpinBox()
+        self.nice.setRange(0, 19)
+        self.nice.setValue(profile["nice"])
+        layout.addRow("Приоритет (nice):", self.nice)
+
+        self.ionice_class = QComboBox()
+        self.ionice_class.addItem("по умолчанию", 0)
+        self.ionice_class.addItem("best-effort", 2)
+        self.ionice_class.addItem("idle", 3)
+        self.ionice_class.setCurrentIndex(max(self.ionice_class.findData(profile["ionice_class"]), 0))
+        layout.addRow("Класс ввода-вывода:", self.ionice_class)
+
+        self.ionice_level = QSpinBox()
+        self.ionice_level.setRange(0, 7)
+        self.ionice_level.setValue(profile["ionice_level"])
+        layout.addRow("Уровень ввода-вывода:", self.ionice_level)
+
+        self.cpu_affinity = QLineEdit(profile["cpu_affinity"])
+        self.cpu_affinity.setPlaceholderText("например 0,2-3")
+        layout.addRow("Ядра CPU:", self.cpu_affinity)
+
+        self.use_cgroup = QCheckBox("Запускать в cgroup v2, если доступно")
+        self.use_cgroup.setChecked(bool(profile["use_cgroup"]))
+        layout.addRow(self.use_cgroup)
+
+        self.cpu_quota = QSpinBox()
+        self.cpu_quota.setRange(0, 100 * (os.cpu_count() or 1))
+        self.cpu_quota.setSuffix(" %")
+        self.cpu_quota.setSpecialValueText("без ограничения")
+        self.cpu_quota.setValue(profile["cpu_quota"])
+        layout.addRow("Квота CPU (cgroup):", self.cpu_quota)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.validate)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def validate(self):
+        try:
+            parse_cpu_list(self.cpu_affinity.text())
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Неверный список ядер CPU.")
+            return
+        self.accept()
+
+    def profile(self):
+        return {
+            "memory_mb": self.memory_mb.value(),
+            "cpu_seconds": self.cpu_seconds.value(),
+            "open_files": self.open_files.value(),
+            "nice": self.nice.value(),
+            "ionice_class": self.ionice_class.currentData(),
+            "ionice_level": self.ionice_level.value(),
+            "cpu_affinity": self.cpu_affinity.text().strip(),
+            "use_cgroup": int(self.use_cgroup.isChecked()),
+            "cpu_quota": self.cpu_quota.value(),
+        }
+
+
+class BatchRunner(QObject):
+    item_started = Signal(int, int)
+    item_finished = Signal(int, int, int, str)
+    finished = Signal()
+
+    def __init__(self, python_exe, script_path, items, workers, retries, use_stdin, profile, cgroup_prefix):
+        super().__init__()
+        self.python_exe = python_exe
+        self.script_path = script_path
+        self.items = items
+        self.workers = workers
+        self.retries = retries
+        self.use_stdin = use_stdin
+        self.profile = profile
+        self.cgroup_prefix = cgroup_prefix
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._running = set()
+        self._pool = None
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._pool:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            for process in self._running:
+                if process.poll() is None:
+                    process.terminate()
+
+    def _run(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        for index, item in enumerate(self.items):
+            with self._lock:
+                if self.cancelled:
+                    break
+                self._pool.submit(self._run_item, index, item)
+        self._pool.shutdown(wait=True)
+        self.finished.emit()
+
+    def _run_item(self, index, item):
+        try:
+            args = () if self.use_stdin else shlex.split(item)
+        except ValueError as e:
+            # Ошибка разбора параметров повторится при каждой попытке, поэтому сразу окончательная
+            self.item_finished.emit(index, 0, -1, f"Неверные параметры: {e}")
+            return
+
+        attempt, returncode, output = 0, -1, ""
+        # Первая попытка плюс self.retries повторов при ненулевом коде выхода
+        while attempt <= self.retries:
+            if self.cancelled:
+                return
+            attempt += 1
+            self.item_started.emit(index, attempt)
+            # Каждый процесс получает свою cgroup: лимиты карточки действуют на запуск, а не на весь пул
+            cgroup_path, warning = None, ""
+            try:
+                cgroup_path = prepare_cgroup(self.cgroup_prefix, self.profile)
+            except OSError as e:
+                warning = f"⚠ cgroup недоступен, запуск без него: {e}\n"
+            try:
+                process = subprocess.Popen(
+                    script_command(self.python_exe, self.script_path, self.profile, args, cgroup_path),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True
+                )
+            except OSError as e:
+                remove_cgroup(cgroup_path)
+                returncode, output = -1, warning + str(e)
+                continue
+            with self._lock:
+                self._running.add(process)
+                if self.cancelled:
+                    process.terminate()
+            output, _ = process.communicate(item + "\n" if self.use_stdin else None)
+            output = warning + output
+            with self._lock:
+                self._running.discard(process)
+            remove_cgroup(cgroup_path)
+            returncode = process.returncode
+            if returncode == 0:
+                break
+        # Процессы, прерванные остановкой, считаются пропущенными, а не ошибками
+        if self.cancelled and returncode != 0:
+            return
+        self.item_finished.emit(index, attempt, returncode, output)
+
+
+class BatchRunDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Пакетный запуск")
+        self.resize(480, 420)
+        self.setModal(True)
+
+        layout = QFormLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        self.items_edit = QTextEdit()
+        self.items_edit.setPlaceholderText("Один набор параметров на строку")
+        layout.addRow("Параметры:", self.items_edit)
+
+        load_button = QPushButton("📁 Загрузить из файла")
+        load_button.clicked.connect(self.load_items)
+        layout.addRow(load_button)
+
+        self.mode = QComboBox()
+        self.mode.addItem("аргументы командной строки", False)
+        self.mode.addItem("стандартный ввод (stdin)", True)
+        layout.addRow("Передавать как:", self.mode)
+
+        self.workers = QSpinBox()
+        self.workers.setRange(1, 256)
+        self.workers.setValue(os.cpu_count() or 1)
+        layout.addRow("Процессов:", self.workers)
+
+        self.retries = QSpinBox()
+        self.retries.setRange(0, 10)
+        self.retries.setValue(1)
+        layout.addRow("Повторов при ошибке:", self.retries)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def load_items(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Файл с параметрами", "", "Текст (*.txt *.csv);;Все файлы (*)")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                self.items_edit.setPlainText(f.read())
+
+    def items(self):
+        return [line.strip() for line in self.items_edit.toPlainText().splitlines() if line.strip()]
+
+    def use_stdin(self):
+        return self.mode.currentData()
+
+
+class BatchResultsWindow(QDialog):
+    def __init__(self, title, runner, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Пакетный запуск: {title}")
+        self.resize(760, 480)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.runner = runner
+        self.done_count = 0
+        self.failed_count = 0
+        self.finished_rows = set()
+        self.started_at = time.monotonic()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+
+        self.progress = QProgressBar()
+        self.progress.setRange(0, len(runner.items))
+        layout.addWidget(self.progress)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.table = QTableWidget(len(runner.items), 4)
+        self.table.setHorizontalHeaderLabels(["Параметры", "Попытки", "Код", "Вывод"])
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, item in enumerate(runner.items):
+            self.table.setItem(row, 0, QTableWidgetItem(item))
+        layout.addWidget(self.table)
+
+        self.cancel_button = QPushButton("■ Stop")
+        self.cancel_button.clicked.connect(self.runner.cancel)
+        layout.addWidget(self.cancel_button, 0, Qt.AlignRight)
+
+        runner.item_started.connect(self.on_item_started)
+        runner.item_finished.connect(self.on_item_finished)
+        runner.finished.connect(self.on_finished)
+        self.update_status()
+
+    def on_item_started(self, row, attempt):
+        self.table.setItem(row, 1, QTableWidgetItem(str(attempt)))
+        self.table.setItem(row, 2, QTableWidgetItem("…"))
+
+    def on_item_finished(self, row, attempt, returncode, output):
+        self.finished_rows.add(row)
+        self.done_count += 1
+        if returncode != 0:
+            self.failed_count += 1
+        lines = output.strip().splitlines()
+        output_item = QTableWidgetItem(lines[-1] if lines else "")
+        output_item.setToolTip(output)
+        code_item = QTableWidgetItem(str(returncode))
+        code_item.setForeground(Qt.darkGreen if returncode == 0 else Qt.red)
+        self.table.setItem(row, 1, QTableWidgetItem(str(attempt)))
+        self.table.setItem(row, 2, code_item)
+        self.table.setItem(row, 3, output_item)
+        self.progress.setValue(self.done_count)
+        self.update_status()
+
+    def on_finished(self):
+        self.cancel_button.setEnabled(False)
+        for row in range(len(self.runner.items)):
+            if row not in self.finished_rows:
+                self.table.setItem(row, 2, QTableWidgetItem("—"))
+                self.table.setItem(row, 3, QTableWidgetItem("пропущено"))
+        self.update_status(finished=True)
+
+    def update_status(self, finished=False):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        text = (f"Готово {self.done_count}/{len(self.runner.items)}, ошибок {self.failed_count}, "
+                f"{self.done_count / elapsed:.2f} шт/с")
+        if finished and self.done_count < len(self.runner.items):
+            text += f", пропущено {len(self.runner.items) - self.done_count}"
+        if finished:
+            text += " — остановлено" if self.runner.cancelled else " — завершено"
+        self.status_label.setText(text)
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        super().closeEvent(event)
+
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -550,8 +1404,11 @@ class MainWindow(QWidget):
 
         from main import CardPage, EditorPage, SettingsWindow
         self.stack = QStackedWidget()
-        self.card_page = CardPage(self.open_editor)
+        self.feed = ChangeFeed()
+        self.card_page = CardPage(self.open_editor, feed=self.feed)
         self.editor_page = EditorPage()
+        self.feed.changed.connect(self.card_page.apply_changes)
+        self.feed.changed.connect(self.editor_page.apply_changes)
         self.stack.addWidget(self.card_page)
         self.stack.addWidget(self.editor_page)
 
@@ -674,8 +1531,8 @@ class MainWindow(QWidget):
         self._bg_label.setPixmap(scaled)
         self._bg_label.lower()
 
-    def open_editor(self, title, desc):
-        self.editor_page.set_content(title, desc)
+    def open_editor(self, card_id, title, desc):
+        self.editor_page.set_content(card_id, title, desc)
         self.stack.setCurrentWidget(self.editor_page)
 
     def go_back(self):